@@ -4,41 +4,134 @@ This allows the API to run in a limited capacity even without the full models
 """
 import random
 import logging
+from bisect import bisect_left
+from itertools import accumulate
 from typing import Dict, Any, List, Tuple, Optional
 import numpy as np
 
 logger = logging.getLogger("fallback_models")
 
+# Dedicated generator for all fallback draws; values are scaled inline as
+# lo + (hi - lo) * rand() rather than going through random.uniform/randint
+_RNG = random.Random()
+
+# ===== PRECOMPUTED DISTRIBUTIONS =====
+
+def _build_distribution(items_with_weights: List[Tuple]) -> Tuple[Tuple, Tuple[float, ...]]:
+    """Split (item, weight) pairs into an items tuple and its cumulative weights (ending at 1.0)"""
+    items, weights = zip(*items_with_weights)
+    total = sum(weights)
+    return items, tuple(c / total for c in accumulate(weights))
+
+# Face shapes with realistic probabilities
+_FACE_ITEMS, _FACE_CUM = _build_distribution([
+    ("Oval", 0.25),
+    ("Round", 0.20),
+    ("Square", 0.15),
+    ("Heart", 0.15),
+    ("Diamond", 0.10),
+    ("Rectangle", 0.10),
+    ("Triangle", 0.05)
+])
+
+# Male body shapes
+_BODY_M_ITEMS, _BODY_M_CUM = _build_distribution([
+    ("Trapezoid", 0.3),
+    ("Rectangle", 0.25),
+    ("Triangle", 0.2),
+    ("Oval", 0.15),
+    ("Inverted Triangle", 0.1)
+])
+
+# Female body shapes (default)
+_BODY_F_ITEMS, _BODY_F_CUM = _build_distribution([
+    ("Hourglass", 0.25),
+    ("Rectangle", 0.25),
+    ("Pear", 0.20),
+    ("Apple", 0.15),
+    ("Inverted Triangle", 0.15)
+])
+
+# Fitzpatrick scale skin types
+_SKIN_ITEMS, _SKIN_CUM = _build_distribution([
+    ("Type I - Very fair", 0.1),
+    ("Type II - Fair", 0.2),
+    ("Type III - Medium", 0.3),
+    ("Type IV - Olive", 0.2),
+    ("Type V - Brown", 0.15),
+    ("Type VI - Dark brown to black", 0.05)
+])
+
+# Color families
+_UNDERTONE_ITEMS, _UNDERTONE_CUM = _build_distribution([
+    ("Cool", 0.3),
+    ("Neutral", 0.4),
+    ("Warm", 0.3)
+])
+
+def _make_picker(name: str, items: Tuple, cum: Tuple[float, ...]):
+    """Compile a sampler for a fixed distribution as a flat if-chain over its cumulative weights"""
+    lines = [f"def {name}():", "    r = _rand()"]
+    for item, c in zip(items, cum[:-1]):
+        # '<=' matches bisect_left, so the picker draws exactly like _sample
+        lines.append(f"    if r <= {c!r}: return {item!r}")
+    lines.append(f"    return {items[-1]!r}")
+    namespace = {"_rand": _RNG.random}
+    exec("\n".join(lines), namespace)
+    return namespace[name]
+
+_pick_face_shape = _make_picker("_pick_face_shape", _FACE_ITEMS, _FACE_CUM)
+_pick_male_body_shape = _make_picker("_pick_male_body_shape", _BODY_M_ITEMS, _BODY_M_CUM)
+_pick_female_body_shape = _make_picker("_pick_female_body_shape", _BODY_F_ITEMS, _BODY_F_CUM)
+_pick_skin_tone = _make_picker("_pick_skin_tone", _SKIN_ITEMS, _SKIN_CUM)
+_pick_undertone = _make_picker("_pick_undertone", _UNDERTONE_ITEMS, _UNDERTONE_CUM)
+
+# Base RGB ranges for different skin tones
+_SKIN_BASE_RANGES = {
+    "Type I - Very fair": ((240, 255), (220, 240), (200, 225)),
+    "Type II - Fair": ((225, 245), (200, 220), (175, 200)),
+    "Type III - Medium": ((200, 225), (170, 200), (140, 170)),
+    "Type IV - Olive": ((180, 200), (150, 180), (120, 150)),
+    "Type V - Brown": ((150, 180), (120, 150), (90, 120)),
+    "Type VI - Dark brown to black": ((90, 120), (70, 90), (60, 80))
+}
+
+# Undertone adjustments
+_UNDERTONE_ADJUSTMENTS = {
+    "Cool": (-10, 0, 10),
+    "Neutral": (0, 0, 0),
+    "Warm": (10, 5, -10)
+}
+
+# (min, span) per RGB channel for every tone/undertone pair, with the
+# undertone adjustment already folded into min
+_SKIN_RGB_TABLE = {
+    (tone, undertone): tuple((lo + adj, hi - lo + 1) for (lo, hi), adj in zip(ranges, adjustments))
+    for tone, ranges in _SKIN_BASE_RANGES.items()
+    for undertone, adjustments in _UNDERTONE_ADJUSTMENTS.items()
+}
+
 # ===== FACE SHAPE ANALYSIS FALLBACKS =====
 
 def fallback_face_shape_analysis(image_data) -> Dict[str, Any]:
     """Fallback face shape analysis that returns realistic but random data"""
-    # Define possible face shapes with realistic probabilities
-    face_shapes = [
-        ("Oval", 0.25),
-        ("Round", 0.20),
-        ("Square", 0.15),
-        ("Heart", 0.15),
-        ("Diamond", 0.10),
-        ("Rectangle", 0.10),
-        ("Triangle", 0.05)
-    ]
+    rand = _RNG.random
     
     # Weighted random selection
-    selected_shape, _ = weighted_random_selection(face_shapes)
-    confidence = random.uniform(0.75, 0.95)  # High confidence
+    selected_shape = _pick_face_shape()
+    confidence = 0.75 + (0.95 - 0.75) * rand()  # High confidence
     
     # Generate realistic facial features measurements
     features = {
-        "face_width": random.uniform(120, 160),
-        "face_height": random.uniform(180, 220),
-        "jaw_width": random.uniform(110, 150),
-        "forehead_width": random.uniform(115, 155),
-        "chin_prominence": random.uniform(0.1, 0.5),
-        "cheekbone_width": random.uniform(120, 165)
+        "face_width": 120 + (160 - 120) * rand(),
+        "face_height": 180 + (220 - 180) * rand(),
+        "jaw_width": 110 + (150 - 110) * rand(),
+        "forehead_width": 115 + (155 - 115) * rand(),
+        "chin_prominence": 0.1 + (0.5 - 0.1) * rand(),
+        "cheekbone_width": 120 + (165 - 120) * rand()
     }
     
-    logger.info(f"Using fallback face analysis: {selected_shape} with {confidence:.2f} confidence")
+    logger.info("Using fallback face analysis: %s with %.2f confidence", selected_shape, confidence)
     
     return {
         "face_shape": selected_shape,
@@ -51,40 +144,25 @@ def fallback_face_shape_analysis(image_data) -> Dict[str, Any]:
 
 def fallback_body_shape_analysis(image_data, gender: str = "female") -> Dict[str, Any]:
     """Fallback body shape analysis that returns realistic but random data"""
+    rand = _RNG.random
     
+    # Weighted random selection
     if gender.lower() in ["male", "m"]:
-        # Male body shapes
-        body_shapes = [
-            ("Trapezoid", 0.3),
-            ("Rectangle", 0.25),
-            ("Triangle", 0.2),
-            ("Oval", 0.15),
-            ("Inverted Triangle", 0.1)
-        ]
+        selected_shape = _pick_male_body_shape()
     else:
-        # Female body shapes (default)
-        body_shapes = [
-            ("Hourglass", 0.25),
-            ("Rectangle", 0.25),
-            ("Pear", 0.20),
-            ("Apple", 0.15),
-            ("Inverted Triangle", 0.15)
-        ]
-    
-    # Weighted random selection
-    selected_shape, _ = weighted_random_selection(body_shapes)
-    confidence = random.uniform(0.8, 0.95)
+        selected_shape = _pick_female_body_shape()
+    confidence = 0.8 + (0.95 - 0.8) * rand()
     
     # Generate realistic body measurement ratios
     measurements = {
-        "shoulder_to_waist_ratio": random.uniform(0.8, 1.4),
-        "waist_to_hip_ratio": random.uniform(0.7, 1.1),
-        "inseam_to_height_ratio": random.uniform(0.4, 0.5),
-        "shoulder_width": random.uniform(36, 50),
-        "hip_width": random.uniform(34, 48)
+        "shoulder_to_waist_ratio": 0.8 + (1.4 - 0.8) * rand(),
+        "waist_to_hip_ratio": 0.7 + (1.1 - 0.7) * rand(),
+        "inseam_to_height_ratio": 0.4 + (0.5 - 0.4) * rand(),
+        "shoulder_width": 36 + (50 - 36) * rand(),
+        "hip_width": 34 + (48 - 34) * rand()
     }
     
-    logger.info(f"Using fallback body analysis: {selected_shape} with {confidence:.2f} confidence")
+    logger.info("Using fallback body analysis: %s with %.2f confidence", selected_shape, confidence)
     
     return {
         "body_type": selected_shape,
@@ -97,29 +175,13 @@ def fallback_body_shape_analysis(image_data, gender: str = "female") -> Dict[str
 
 def fallback_skin_tone_analysis(image_data) -> Dict[str, Any]:
     """Fallback skin tone analysis that returns realistic but random data"""
+    rand = _RNG.random
     
-    # Fitzpatrick scale skin types
-    skin_tones = [
-        ("Type I - Very fair", 0.1),
-        ("Type II - Fair", 0.2),
-        ("Type III - Medium", 0.3),
-        ("Type IV - Olive", 0.2),
-        ("Type V - Brown", 0.15),
-        ("Type VI - Dark brown to black", 0.05)
-    ]
-    
-    # Color families
-    undertones = [
-        ("Cool", 0.3),
-        ("Neutral", 0.4),
-        ("Warm", 0.3)
-    ]
-    
-    selected_tone, _ = weighted_random_selection(skin_tones)
-    selected_undertone, _ = weighted_random_selection(undertones)
-    confidence = random.uniform(0.75, 0.95)
+    selected_tone = _pick_skin_tone()
+    selected_undertone = _pick_undertone()
+    confidence = 0.75 + (0.95 - 0.75) * rand()
     
-    logger.info(f"Using fallback skin analysis: {selected_tone} with {selected_undertone} undertone")
+    logger.info("Using fallback skin analysis: %s with %s undertone", selected_tone, selected_undertone)
     
     return {
         "skin_tone": selected_tone,
@@ -131,40 +193,26 @@ def fallback_skin_tone_analysis(image_data) -> Dict[str, Any]:
 
 # ===== HELPER FUNCTIONS =====
 
+def _sample(items: Tuple, cum: Tuple[float, ...]):
+    """Draw one item from a precomputed cumulative distribution"""
+    return items[bisect_left(cum, _RNG.random())]
+
 def weighted_random_selection(items_with_weights: List[Tuple]) -> Tuple:
     """Select an item based on its weight"""
     items, weights = zip(*items_with_weights)
     total = sum(weights)
-    normalized_weights = [w/total for w in weights]
-    return random.choices(items, normalized_weights, k=1)[0], normalized_weights
+    normalized_weights = [w / total for w in weights]
+    cum = [c / total for c in accumulate(weights)]
+    return _sample(items, cum), normalized_weights
 
 def generate_realistic_skin_rgb(skin_tone: str, undertone: str) -> Dict[str, int]:
     """Generate a realistic RGB value for the given skin tone and undertone"""
+    (r_min, r_span), (g_min, g_span), (b_min, b_span) = _SKIN_RGB_TABLE[skin_tone, undertone]
     
-    # Base RGB ranges for different skin tones
-    base_ranges = {
-        "Type I - Very fair": ((240, 255), (220, 240), (200, 225)),
-        "Type II - Fair": ((225, 245), (200, 220), (175, 200)),
-        "Type III - Medium": ((200, 225), (170, 200), (140, 170)),
-        "Type IV - Olive": ((180, 200), (150, 180), (120, 150)),
-        "Type V - Brown": ((150, 180), (120, 150), (90, 120)),
-        "Type VI - Dark brown to black": ((90, 120), (70, 90), (60, 80))
-    }
-    
-    # Undertone adjustments
-    undertone_adjustments = {
-        "Cool": (-10, 0, 10),
-        "Neutral": (0, 0, 0),
-        "Warm": (10, 5, -10)
-    }
-    
-    # Get base range and undertone adjustment
-    (r_min, r_max), (g_min, g_max), (b_min, b_max) = base_ranges[skin_tone]
-    r_adj, g_adj, b_adj = undertone_adjustments[undertone]
-    
-    # Generate RGB values with adjustments
-    r = max(0, min(255, random.randint(r_min, r_max) + r_adj))
-    g = max(0, min(255, random.randint(g_min, g_max) + g_adj))
-    b = max(0, min(255, random.randint(b_min, b_max) + b_adj))
+    # Generate RGB values with adjustments (integers in [min, min + span))
+    rand = _RNG.random
+    r = max(0, min(255, r_min + int(r_span * rand())))
+    g = max(0, min(255, g_min + int(g_span * rand())))
+    b = max(0, min(255, b_min + int(b_span * rand())))
     
     return {"r": r, "g": g, "b": b}
@@ -4,7 +4,7 @@ This version uses fallbacks for ML models to reduce dependencies and size
 """
 from fastapi import FastAPI, File, UploadFile, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from typing import Dict, List, Optional
 import uvicorn
 import os
@@ -12,12 +12,13 @@ import logging
 import json
 import random
 import csv
+from collections import defaultdict
 from pathlib import Path
 from datetime import datetime
 
 # Configure logging
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
         logging.FileHandler("aurasync_api.log"),
@@ -37,7 +38,7 @@ from fallback_models import (
 try:
     from model_downloader import check_and_download_models
     MODELS_AVAILABLE = check_and_download_models()
-    logger.info(f"Model availability check: {'✅ Models available' if MODELS_AVAILABLE else '⚠️ Using fallbacks'}")
+    logger.info("Model availability check: %s", '✅ Models available' if MODELS_AVAILABLE else '⚠️ Using fallbacks')
 except ImportError:
     MODELS_AVAILABLE = False
     logger.warning("⚠️ Model downloader not available - will use fallbacks")
@@ -74,6 +75,7 @@ app = FastAPI(
     title="AuraSync Fashion Recommendation API",
     description="API for fashion recommendations based on body type, face shape, skin tone, and personality analysis",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
 )
 
 # Configure CORS
@@ -82,7 +84,7 @@ try:
     origins = json.loads(origins_str)
 except json.JSONDecodeError:
     origins = ["http://localhost:3000", "https://auraasync.in"]
-    logger.warning(f"Invalid CORS_ORIGINS format: {origins_str}. Using default origins.")
+    logger.warning("Invalid CORS_ORIGINS format: %s. Using default origins.", origins_str)
 
 app.add_middleware(
     CORSMiddleware,
@@ -92,122 +94,157 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Static part of the health response; feature flags are fixed at import time
+HEALTH_RESPONSE = {
+    "status": "healthy",
+    "version": "1.0.0",
+    "features": {
+        "opencv": CV2_AVAILABLE,
+        "enhanced_analysis": ENHANCED_ANALYSIS_AVAILABLE,
+        "models_available": MODELS_AVAILABLE
+    }
+}
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
     """Health check endpoint for monitoring services"""
-    return {
-        "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
-        "version": "1.0.0",
-        "features": {
-            "opencv": CV2_AVAILABLE,
-            "enhanced_analysis": ENHANCED_ANALYSIS_AVAILABLE,
-            "models_available": MODELS_AVAILABLE
-        }
-    }
+    return {**HEALTH_RESPONSE, "timestamp": datetime.now().isoformat()}
+
+async def decode_upload_image(file: UploadFile):
+    """Decode an uploaded image into an OpenCV BGR array"""
+    # Rewind the spooled upload and wrap its bytes without copying them
+    await file.seek(0)
+    nparr = np.frombuffer(await file.read(), np.uint8)
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+# Analysis endpoints come in two variants, picked once at startup below.
+# The fallback variants declare no file parameter, so FastAPI never parses
+# the multipart upload they would ignore anyway.
 
 # Body type analysis endpoint
-@app.post("/analyze/body")
 async def analyze_body(file: UploadFile = File(...), gender: Optional[str] = "female"):
     """
     Analyze body type from an uploaded image
-    Uses enhanced analysis if available, otherwise uses fallback
+    Uses enhanced analysis, falling back to basic analysis if it fails
     """
     try:
-        # Read image file
-        contents = await file.read()
+        img = await decode_upload_image(file)
         
-        # Use enhanced analysis if available
-        if CV2_AVAILABLE and ENHANCED_ANALYSIS_AVAILABLE and MODELS_AVAILABLE:
-            try:
-                # Convert bytes to numpy array
-                nparr = np.frombuffer(contents, np.uint8)
-                img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                
-                # Call enhanced analysis
-                result = analyze_body_type(img, gender=gender)
-                logger.info(f"Enhanced body analysis complete: {result.get('body_type')}")
-                return result
-            except Exception as e:
-                logger.error(f"Enhanced analysis failed: {e}")
-                logger.info("Falling back to basic analysis")
-        
-        # Use fallback analysis
-        result = fallback_body_shape_analysis(contents, gender=gender)
-        logger.info(f"Fallback body analysis complete: {result.get('body_type')}")
+        # Call enhanced analysis
+        result = analyze_body_type(img, gender=gender)
+        logger.info("Enhanced body analysis complete: %s", result.get('body_type'))
+        return result
+    except Exception as e:
+        logger.error("Enhanced analysis failed: %s", e)
+        logger.info("Falling back to basic analysis")
+    finally:
+        # Release the spooled upload as soon as the image is decoded
+        await file.close()
+    
+    return await analyze_body_fallback(gender=gender)
+
+async def analyze_body_fallback(gender: Optional[str] = "female"):
+    """
+    Analyze body type using fallback analysis
+    The uploaded image is not read since the fallback does not use it
+    """
+    try:
+        result = fallback_body_shape_analysis(None, gender=gender)
+        logger.info("Fallback body analysis complete: %s", result.get('body_type'))
         return result
     
     except Exception as e:
-        logger.error(f"Body analysis failed: {e}")
+        logger.error("Body analysis failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Body analysis failed: {str(e)}")
 
 # Face shape analysis endpoint
-@app.post("/analyze/face")
 async def analyze_face(file: UploadFile = File(...)):
     """
     Analyze face shape from an uploaded image
-    Uses ML model if available, otherwise uses fallback
+    Uses ML model, falling back to basic analysis if it fails
     """
     try:
-        # Read image file
+        # This is a placeholder - in real code we'd call the actual ML model
+        # Simulating ML analysis for now
         contents = await file.read()
-        
-        # Use ML analysis if available (simplified - in real code we'd import face analysis module)
-        if CV2_AVAILABLE and MODELS_AVAILABLE:
-            try:
-                # This is a placeholder - in real code we'd call the actual ML model
-                # Simulating ML analysis for now
-                result = fallback_face_shape_analysis(contents)
-                result["using_fallback"] = False
-                logger.info(f"ML face analysis complete: {result.get('face_shape')}")
-                return result
-            except Exception as e:
-                logger.error(f"ML face analysis failed: {e}")
-                logger.info("Falling back to basic analysis")
-        
-        # Use fallback analysis
         result = fallback_face_shape_analysis(contents)
-        logger.info(f"Fallback face analysis complete: {result.get('face_shape')}")
+        result["using_fallback"] = False
+        logger.info("ML face analysis complete: %s", result.get('face_shape'))
+        return result
+    except Exception as e:
+        logger.error("ML face analysis failed: %s", e)
+        logger.info("Falling back to basic analysis")
+    finally:
+        # Release the spooled upload as soon as it has been analysed
+        await file.close()
+    
+    return await analyze_face_fallback()
+
+async def analyze_face_fallback():
+    """
+    Analyze face shape using fallback analysis
+    The uploaded image is not read since the fallback does not use it
+    """
+    try:
+        result = fallback_face_shape_analysis(None)
+        logger.info("Fallback face analysis complete: %s", result.get('face_shape'))
         return result
     
     except Exception as e:
-        logger.error(f"Face analysis failed: {e}")
+        logger.error("Face analysis failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Face analysis failed: {str(e)}")
 
 # Skin tone analysis endpoint
-@app.post("/analyze/skin")
 async def analyze_skin(file: UploadFile = File(...)):
     """
     Analyze skin tone from an uploaded image
-    Uses ML model if available, otherwise uses fallback
+    Uses ML model, falling back to basic analysis if it fails
     """
     try:
-        # Read image file
+        # This is a placeholder - in real code we'd call the actual ML model
+        # Simulating ML analysis for now
         contents = await file.read()
-        
-        # Use ML analysis if available
-        if CV2_AVAILABLE and MODELS_AVAILABLE:
-            try:
-                # This is a placeholder - in real code we'd call the actual ML model
-                # Simulating ML analysis for now
-                result = fallback_skin_tone_analysis(contents)
-                result["using_fallback"] = False
-                logger.info(f"ML skin analysis complete: {result.get('skin_tone')}")
-                return result
-            except Exception as e:
-                logger.error(f"ML skin analysis failed: {e}")
-                logger.info("Falling back to basic analysis")
-        
-        # Use fallback analysis
         result = fallback_skin_tone_analysis(contents)
-        logger.info(f"Fallback skin analysis complete: {result.get('skin_tone')}")
+        result["using_fallback"] = False
+        logger.info("ML skin analysis complete: %s", result.get('skin_tone'))
+        return result
+    except Exception as e:
+        logger.error("ML skin analysis failed: %s", e)
+        logger.info("Falling back to basic analysis")
+    finally:
+        # Release the spooled upload as soon as it has been analysed
+        await file.close()
+    
+    return await analyze_skin_fallback()
+
+async def analyze_skin_fallback():
+    """
+    Analyze skin tone using fallback analysis
+    The uploaded image is not read since the fallback does not use it
+    """
+    try:
+        result = fallback_skin_tone_analysis(None)
+        logger.info("Fallback skin analysis complete: %s", result.get('skin_tone'))
         return result
     
     except Exception as e:
-        logger.error(f"Skin analysis failed: {e}")
+        logger.error("Skin analysis failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Skin analysis failed: {str(e)}")
 
+# Mount the ML variant only when its dependencies are available
+if CV2_AVAILABLE and ENHANCED_ANALYSIS_AVAILABLE and MODELS_AVAILABLE:
+    app.add_api_route("/analyze/body", analyze_body, methods=["POST"])
+else:
+    app.add_api_route("/analyze/body", analyze_body_fallback, methods=["POST"])
+
+if CV2_AVAILABLE and MODELS_AVAILABLE:
+    app.add_api_route("/analyze/face", analyze_face, methods=["POST"])
+    app.add_api_route("/analyze/skin", analyze_skin, methods=["POST"])
+else:
+    app.add_api_route("/analyze/face", analyze_face_fallback, methods=["POST"])
+    app.add_api_route("/analyze/skin", analyze_skin_fallback, methods=["POST"])
+
 # Personality-based recommendations
 PERSONALITY_STYLES = {
     "ISTJ": "Classic and traditional styles with high-quality fabrics and timeless designs.",
@@ -228,11 +265,14 @@ PERSONALITY_STYLES = {
     "ENTJ": "Power dressing with sharp tailoring and status-signaling elements."
 }
 
+# Valid (upper-cased) MBTI codes for membership checks
+MBTI_TYPES = frozenset(PERSONALITY_STYLES)
+
 @app.get("/personality/{mbti_type}")
 async def personality_recommendation(mbti_type: str):
     """Get style recommendations based on MBTI personality type"""
     mbti_type = mbti_type.upper()
-    if mbti_type not in PERSONALITY_STYLES:
+    if mbti_type not in MBTI_TYPES:
         raise HTTPException(status_code=400, detail=f"Invalid MBTI type: {mbti_type}")
     
     return {
@@ -247,22 +287,39 @@ def load_products():
     try:
         products_file = Path(__file__).parent / "products.csv"
         if not products_file.exists():
-            logger.warning(f"Products file not found at {products_file}")
+            logger.warning("Products file not found at %s", products_file)
             return []
         
-        with open(products_file, mode='r', encoding='utf-8') as file:
-            csv_reader = csv.DictReader(file)
-            for row in csv_reader:
-                products.append(row)
-        logger.info(f"Loaded {len(products)} products from CSV")
+        with open(products_file, mode='r', encoding='utf-8', newline='') as file:
+            # Read the fixed header once and zip it onto each row, skipping
+            # DictReader's per-row bookkeeping
+            csv_reader = csv.reader(file)
+            header = next(csv_reader, [])
+            products = [dict(zip(header, row)) for row in csv_reader if row]
+        logger.info("Loaded %s products from CSV", len(products))
     except Exception as e:
-        logger.error(f"Failed to load products: {e}")
+        logger.error("Failed to load products: %s", e)
         products = []
     
     return products
 
 PRODUCTS = load_products()
 
+# Lower-cased gender column, aligned with PRODUCTS, so filters compare
+# plain strings instead of normalising every row on every request
+PRODUCT_GENDERS = [(p.get("gender") or "").lower() for p in PRODUCTS]
+
+def index_products_by_gender(products, genders):
+    """Group products into immutable per-gender tuples"""
+    by_gender = defaultdict(list)
+    for product, gender in zip(products, genders):
+        by_gender[gender].append(product)
+    return {gender: tuple(items) for gender, items in by_gender.items()}
+
+# Built once so requests index straight into their gender's slice
+# instead of scanning the whole catalogue
+PRODUCTS_BY_GENDER = index_products_by_gender(PRODUCTS, PRODUCT_GENDERS)
+
 @app.post("/recommend")
 async def recommend_style(request: Request):
     """
@@ -291,7 +348,7 @@ async def recommend_style(request: Request):
             }
         }
     except Exception as e:
-        logger.error(f"Recommendation generation failed: {e}")
+        logger.error("Recommendation generation failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to generate recommendation: {str(e)}")
 
 @app.post("/products/recommendations")
@@ -307,9 +364,9 @@ async def product_recommendations(request: Request):
         # Filter products based on criteria
         filtered_products = filter_products(gender, body_type, skin_tone, mbti)
         
-        # Return top products
+        # Return 6 random products, sampled without shuffling the whole pool
         return {
-            "products": filtered_products[:6],  # Return top 6 products
+            "products": random.sample(filtered_products, min(6, len(filtered_products))),
             "count": len(filtered_products),
             "filters_applied": {
                 "gender": gender,
@@ -319,7 +376,7 @@ async def product_recommendations(request: Request):
             }
         }
     except Exception as e:
-        logger.error(f"Product recommendation failed: {e}")
+        logger.error("Product recommendation failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to get product recommendations: {str(e)}")
 
 @app.get("/products")
@@ -327,7 +384,7 @@ async def get_products(gender: Optional[str] = None, limit: int = 10):
     """Get all available products with optional filtering"""
     try:
         if gender:
-            filtered = [p for p in PRODUCTS if p.get("gender", "").lower() == gender.lower()]
+            filtered = PRODUCTS_BY_GENDER.get(gender.lower(), ())
         else:
             filtered = PRODUCTS
         
@@ -337,9 +394,37 @@ async def get_products(gender: Optional[str] = None, limit: int = 10):
             "total_products": len(PRODUCTS)
         }
     except Exception as e:
-        logger.error(f"Product retrieval failed: {e}")
+        logger.error("Product retrieval failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to retrieve products: {str(e)}")
 
+# Recommendation text keyed by lower-cased body type / face shape
+BODY_RECOMMENDATIONS = {
+    "hourglass": "Embrace fitted styles that highlight your balanced proportions. Wrap dresses and belted jackets work especially well for your figure.",
+    "rectangle": "Create curves with peplum tops, layered outfits, and statement belts to define your waist.",
+    "triangle": "Balance your proportions with structured tops, wider necklines, and A-line skirts or dresses.",
+    "inverted triangle": "Balance your broader shoulders with full skirts, wide-leg pants, and details at the hip area.",
+    "oval": "Define your waistline with empire waists and vertical patterns. V-necks and A-line silhouettes are particularly flattering."
+}
+
+FACE_RECOMMENDATIONS = {
+    "oval": "You can wear most styles. Experiment with different necklines and accessories.",
+    "round": "Create length with V-necks, long earrings, and hairstyles with height.",
+    "square": "Soften your angles with round necklines and curved accessories.",
+    "heart": "Balance your wider forehead with wider bottoms and choker necklaces.",
+    "diamond": "Highlight your cheekbones with earrings and avoid oversized eyewear.",
+    "rectangle": "Soften your jawline with round necklines and curved accessories."
+}
+
+# Recommendation text keyed by Fitzpatrick skin type numeral
+SKIN_TONE_RECOMMENDATIONS = {
+    "I": "With your fair skin, jewel tones like emerald, sapphire, and ruby will create stunning contrast. Soft pastels also complement your complexion beautifully.",
+    "II": "With your fair skin, jewel tones like emerald, sapphire, and ruby will create stunning contrast. Soft pastels also complement your complexion beautifully.",
+    "III": "Your medium skin tone works well with both warm and cool colors. Rich hues like olive green, teal, and coral pink are particularly flattering.",
+    "IV": "Your olive skin tone is complemented by earthy colors like terracotta, mustard, and olive green, as well as vibrant jewel tones.",
+    "V": "Your deep skin tone is enhanced by bright, vibrant colors and rich jewel tones. White and cream create beautiful contrast.",
+    "VI": "Your deep skin tone is enhanced by bright, vibrant colors and rich jewel tones. White and cream create beautiful contrast."
+}
+
 # Helper functions
 def generate_recommendation(gender, body_type, face_shape, mbti, skin_tone):
     """Generate a personalized style recommendation based on analysis results"""
@@ -350,41 +435,22 @@ def generate_recommendation(gender, body_type, face_shape, mbti, skin_tone):
     
     # Add body type recommendations
     if body_type:
-        body_recs = {
-            "hourglass": "Embrace fitted styles that highlight your balanced proportions. Wrap dresses and belted jackets work especially well for your figure.",
-            "rectangle": "Create curves with peplum tops, layered outfits, and statement belts to define your waist.",
-            "triangle": "Balance your proportions with structured tops, wider necklines, and A-line skirts or dresses.",
-            "inverted triangle": "Balance your broader shoulders with full skirts, wide-leg pants, and details at the hip area.",
-            "oval": "Define your waistline with empire waists and vertical patterns. V-necks and A-line silhouettes are particularly flattering."
-        }
-        parts.append(body_recs.get(body_type.lower(), "Choose styles that enhance your unique body shape."))
+        parts.append(BODY_RECOMMENDATIONS.get(body_type.lower(), "Choose styles that enhance your unique body shape."))
     
     # Add face shape recommendations
     if face_shape:
-        face_recs = {
-            "oval": "You can wear most styles. Experiment with different necklines and accessories.",
-            "round": "Create length with V-necks, long earrings, and hairstyles with height.",
-            "square": "Soften your angles with round necklines and curved accessories.",
-            "heart": "Balance your wider forehead with wider bottoms and choker necklaces.",
-            "diamond": "Highlight your cheekbones with earrings and avoid oversized eyewear.",
-            "rectangle": "Soften your jawline with round necklines and curved accessories."
-        }
-        parts.append(face_recs.get(face_shape.lower(), "Select necklines and accessories that complement your face shape."))
+        parts.append(FACE_RECOMMENDATIONS.get(face_shape.lower(), "Select necklines and accessories that complement your face shape."))
     
     # Add skin tone recommendations
     if skin_tone:
-        if "I" in skin_tone or "II" in skin_tone:
-            parts.append("With your fair skin, jewel tones like emerald, sapphire, and ruby will create stunning contrast. Soft pastels also complement your complexion beautifully.")
-        elif "III" in skin_tone:
-            parts.append("Your medium skin tone works well with both warm and cool colors. Rich hues like olive green, teal, and coral pink are particularly flattering.")
-        elif "IV" in skin_tone:
-            parts.append("Your olive skin tone is complemented by earthy colors like terracotta, mustard, and olive green, as well as vibrant jewel tones.")
-        else:
-            parts.append("Your deep skin tone is enhanced by bright, vibrant colors and rich jewel tones. White and cream create beautiful contrast.")
+        # "Type III - Medium" -> "III"
+        numeral = skin_tone.split(" - ", 1)[0].replace("Type ", "").strip()
+        parts.append(SKIN_TONE_RECOMMENDATIONS.get(numeral, SKIN_TONE_RECOMMENDATIONS["V"]))
     
     # Add personality recommendations
-    if mbti and mbti.upper() in PERSONALITY_STYLES:
-        parts.append(f"Your {mbti.upper()} personality suggests: {PERSONALITY_STYLES[mbti.upper()]}")
+    mbti = mbti.upper() if mbti else ""
+    if mbti in MBTI_TYPES:
+        parts.append(f"Your {mbti} personality suggests: {PERSONALITY_STYLES[mbti]}")
     
     # Combine all recommendations
     if parts:
@@ -395,24 +461,27 @@ def generate_recommendation(gender, body_type, face_shape, mbti, skin_tone):
     return full_rec
 
 def filter_products(gender, body_type, skin_tone, mbti):
-    """Filter products based on user characteristics"""
+    """
+    Filter products based on user characteristics
+    Returns the shared candidate pool, so callers must not mutate it;
+    sample from it to provide variety
+    """
     # This is a simplified version of product filtering
-    filtered = PRODUCTS.copy()
+    filtered = PRODUCTS
     
     # Filter by gender if specified
     if gender:
-        filtered = [p for p in filtered if p.get("gender", "").lower() == gender.lower()]
+        filtered = PRODUCTS_BY_GENDER.get(gender.lower(), ())
     
     # If no products match or we have too few, return all products
     if len(filtered) < 3:
-        filtered = PRODUCTS.copy()
-    
-    # Randomize order to provide variety
-    random.shuffle(filtered)
+        filtered = PRODUCTS
     
     return filtered
 
 # Run the FastAPI app
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+    # Multiple workers need the app as an import string rather than an object
+    uvicorn.run("main:app", host="0.0.0.0", port=port, loop="uvloop", http="httptools", workers=workers)
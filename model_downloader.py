@@ -7,12 +7,13 @@ import os
 import sys
 import requests
 import logging
+from collections import defaultdict
 from pathlib import Path
 from tqdm import tqdm
 
 # Configure logging
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
         logging.FileHandler("model_download.log"),
@@ -36,11 +37,15 @@ MODEL_URLS_ENV = {
 # Fallback: Use local models (for development)
 USE_FALLBACK = True
 
+# Read/write size for model downloads; large chunks keep per-chunk Python
+# overhead (write + progress update) negligible on multi-hundred-MB files
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
 
 def download_file(url, destination):
     """Download a file from URL to destination with progress bar"""
     try:
-        logger.info(f"Downloading model from {url} to {destination}")
+        logger.info("Downloading model from %s to %s", url, destination)
         
         # Create directory if it doesn't exist
         os.makedirs(os.path.dirname(destination), exist_ok=True)
@@ -57,52 +62,70 @@ def download_file(url, destination):
         
         # Write to file
         with open(destination, 'wb') as file:
-            for chunk in response.iter_content(chunk_size=8192):
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
                 if chunk:
                     progress_bar.update(len(chunk))
                     file.write(chunk)
         
         progress_bar.close()
-        logger.info(f"Successfully downloaded {os.path.basename(destination)}")
+        logger.info("Successfully downloaded %s", os.path.basename(destination))
         return True
     
     except requests.exceptions.RequestException as e:
-        logger.error(f"Error downloading model: {e}")
+        logger.error("Error downloading model: %s", e)
         return False
 
 
+def find_existing_files(base_path, relative_paths):
+    """Return the subset of relative_paths present under base_path, listing each directory once"""
+    names_by_dir = defaultdict(list)
+    for relative_path in relative_paths:
+        dir_name, file_name = os.path.split(relative_path)
+        names_by_dir[dir_name].append((file_name, relative_path))
+    
+    existing = set()
+    for dir_name, names in names_by_dir.items():
+        try:
+            with os.scandir(os.path.join(base_path, dir_name)) as entries:
+                present = {entry.name for entry in entries}
+        except FileNotFoundError:
+            continue
+        existing.update(relative_path for file_name, relative_path in names if file_name in present)
+    
+    return existing
+
+
 def check_and_download_models():
     """Check if models exist and download if necessary"""
     base_path = Path(__file__).parent.absolute()
     
     # Check and create all necessary directories
-    for model_path in MODEL_URLS.keys():
-        dir_path = os.path.join(base_path, os.path.dirname(model_path))
-        if not os.path.exists(dir_path):
-            os.makedirs(dir_path, exist_ok=True)
+    for dir_name in {os.path.dirname(model_path) for model_path in MODEL_URLS}:
+        os.makedirs(os.path.join(base_path, dir_name), exist_ok=True)
     
-    # Check each model
+    # Check each model against a single listing per directory
+    existing_models = find_existing_files(base_path, MODEL_URLS)
     missing_models = []
     for model_path, default_url in MODEL_URLS.items():
         full_path = os.path.join(base_path, model_path)
         
-        if not os.path.exists(full_path):
+        if model_path not in existing_models:
             # Check for environment variable URL
             env_var = MODEL_URLS_ENV.get(model_path)
             url = os.environ.get(env_var, default_url) if env_var else default_url
             
-            logger.info(f"Model not found: {model_path}")
+            logger.info("Model not found: %s", model_path)
             missing_models.append((model_path, url, full_path))
     
     # Download missing models
     if missing_models:
-        logger.info(f"Found {len(missing_models)} missing models. Starting download...")
+        logger.info("Found %s missing models. Starting download...", len(missing_models))
         
         for model_path, url, full_path in missing_models:
             if url == "YOUR_CLOUD_STORAGE_URL_FOR_FACE_MODEL" or url == "YOUR_CLOUD_STORAGE_URL_FOR_BODY_MODEL":
-                logger.warning(f"⚠️ No download URL configured for {model_path}")
+                logger.warning("⚠️ No download URL configured for %s", model_path)
                 if USE_FALLBACK:
-                    logger.info(f"Creating empty model file as fallback for {model_path}")
+                    logger.info("Creating empty model file as fallback for %s", model_path)
                     os.makedirs(os.path.dirname(full_path), exist_ok=True)
                     with open(full_path, 'wb') as f:
                         # Create an empty file as placeholder
@@ -111,7 +134,7 @@ def check_and_download_models():
                 
             success = download_file(url, full_path)
             if not success:
-                logger.error(f"❌ Failed to download {model_path}")
+                logger.error("❌ Failed to download %s", model_path)
                 if USE_FALLBACK:
                     logger.warning("⚠️ Using fallback method with empty model file")
                     # Create empty file as placeholder
@@ -4,12 +4,13 @@ This script handles model checking and starts the FastAPI app
 """
 
 import os
+import asyncio
 import logging
 from pathlib import Path
 
 # Configure logging
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger("aurasync_startup")
@@ -27,30 +28,51 @@ def check_model_files():
         "body-shape-api/body_shape_model.pkl"
     ]
     
+    # List each model directory once instead of stat-ing every path
+    entries = {}
+    for dir_name in {os.path.dirname(model_file) for model_file in model_files}:
+        try:
+            with os.scandir(base_path / dir_name) as it:
+                entries.update(((dir_name, entry.name), entry) for entry in it)
+        except FileNotFoundError:
+            pass
+    
     missing = []
     for model_file in model_files:
-        full_path = base_path / model_file
-        if not full_path.exists():
+        entry = entries.get(os.path.split(model_file))
+        if entry is None:
             missing.append(model_file)
-            logger.warning(f"⚠️ Model file missing: {model_file}")
+            logger.warning("⚠️ Model file missing: %s", model_file)
         else:
-            size_mb = full_path.stat().st_size / (1024 * 1024)
-            logger.info(f"✅ Model file found: {model_file} ({size_mb:.2f} MB)")
+            size_mb = entry.stat().st_size / (1024 * 1024)
+            logger.info("✅ Model file found: %s (%.2f MB)", model_file, size_mb)
     
     if missing:
-        logger.warning(f"⚠️ {len(missing)}/{len(model_files)} model files are missing. API will use fallbacks.")
+        logger.warning("⚠️ %s/%s model files are missing. API will use fallbacks.", len(missing), len(model_files))
     else:
         logger.info("✅ All model files found")
     
     return len(missing) == 0
 
-# Check for models on startup
-check_model_files()
+# Check for models on startup, in a worker thread so neither the import nor
+# the server's startup (which runs before the port is bound) waits on disk
+@app.on_event("startup")
+async def schedule_model_check():
+    app.state.model_check = asyncio.create_task(asyncio.to_thread(check_model_files))
 
 # Run the app
 if __name__ == "__main__":
     import uvicorn
     
     port = int(os.getenv("PORT", 8000))
-    logger.info(f"Starting AuraSync API on port {port}")
-    uvicorn.run("startup:app", host="0.0.0.0", port=port, log_level="info")
+    workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+    logger.info("Starting AuraSync API on port %s with %s workers", port, workers)
+    uvicorn.run(
+        "startup:app",
+        host="0.0.0.0",
+        port=port,
+        log_level="info",
+        loop="uvloop",
+        http="httptools",
+        workers=workers,
+    )